@@ -0,0 +1,14 @@
+# Numba is optional: without it the kernels run as plain NumPy
+# (only the sequential EMA loop is left in Python).
+try:
+    from numba import njit
+except ImportError:
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
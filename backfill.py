@@ -1,113 +1,165 @@
 import datetime
 import logging
 
-from db import upsert, fetch_last_n
-from calculations import (
-    calculate_z_score,
-    calculate_futures_z,
-    calculate_sts,
-    calculate_ema
-)
-from classification import classify_bias, classify_phase
+from db import upsert_many, fetch_last_n_before
+from calculations import calculate_signal_series, calculate_ema_series
+from classification import classify_bias_series, classify_phase_series
 
+import numpy as np
 import pandas as pd
 
 
 logging.basicConfig(level=logging.INFO)
 
+logger = logging.getLogger(__name__)
 
-def backfill_from_csv(csv_path):
+WINDOW = 30
+
+CSV_DTYPES = {
+    "fii_net": "float64",
+    "net_position": "float64",
+    "oi_change": "float64",
+    "pcr": "float64",
+}
 
-    df = pd.read_csv(csv_path)
-    df["trade_date"] = pd.to_datetime(df["trade_date"])
-    df = df.sort_values("trade_date")
 
-    previous_irs = None
+def _with_prior(prior, values):
+    """
+    Prepends the stored history, left-padded with NaN to WINDOW values so
+    every series lines up at the same offset.
+    """
+    padding = np.full(WINDOW - len(prior), np.nan)
+    return np.concatenate([padding, np.asarray(prior, dtype=np.float64), values])
 
-    for _, row in df.iterrows():
 
-        trade_date = row["trade_date"].date()
+def backfill_from_csv(csv_path):
 
-        fii_net = row["fii_net"]
-        net_position = row["net_position"]
-        oi_change = row["oi_change"]
-        pcr_today = row["pcr"]
+    df = pd.read_csv(
+        csv_path,
+        usecols=["trade_date", *CSV_DTYPES],
+        dtype=CSV_DTYPES,
+        parse_dates=["trade_date"],
+    )
+    df.sort_values("trade_date", inplace=True, ignore_index=True)
+
+    if df.empty:
+        logger.info("No CSV rows to backfill.")
+        return
+
+    # -------------------------
+    # Load prior history once
+    # -------------------------
+    first_date = df["trade_date"].iloc[0].date()
+
+    cash_prior = fetch_last_n_before("fii_cash_raw", ["fii_net"], first_date, WINDOW)
+    fut_prior = fetch_last_n_before("index_futures_raw", ["net_position", "oi_change"], first_date, WINDOW)
+    opt_prior = fetch_last_n_before("options_summary_raw", ["pcr"], first_date, WINDOW)
+
+    fii_net = df["fii_net"].to_numpy(dtype=np.float64)
+    net_position = df["net_position"].to_numpy(dtype=np.float64)
+    oi_change = df["oi_change"].to_numpy(dtype=np.float64)
+    pcr = df["pcr"].to_numpy(dtype=np.float64)
+
+    # -------------------------
+    # Calculate signals for all rows at once
+    # -------------------------
+    cash_z, futures_z, pcr_z, sts = (
+        series[WINDOW:]
+        for series in calculate_signal_series(
+            _with_prior(cash_prior["fii_net"], fii_net),
+            _with_prior(fut_prior["net_position"], net_position),
+            _with_prior(fut_prior["oi_change"], oi_change),
+            _with_prior(opt_prior["pcr"], pcr),
+            window=WINDOW,
+        )
+    )
+
+    # The IRS filter starts at the first CSV row with a signal, never on
+    # the stored history used to fill the z-score windows
+    irs = calculate_ema_series(sts)
+
+    # Rows without a full window have no signal and are skipped
+    valid = ~np.isnan(sts)
+
+    bias = classify_bias_series(sts)
+    phase = classify_phase_series(irs)
+
+    # Format dates and round signals once, as plain Python values
+    dates = df["trade_date"].dt.strftime("%Y-%m-%d").tolist()
+
+    fii_net_l = fii_net.tolist()
+    net_position_l = net_position.tolist()
+    oi_change_l = oi_change.tolist()
+    pcr_l = pcr.tolist()
+
+    cash_z_r = np.round(cash_z, 3).tolist()
+    futures_z_r = np.round(futures_z, 3).tolist()
+    pcr_z_r = np.round(pcr_z, 3).tolist()
+    sts_r = np.round(sts, 3).tolist()
+    irs_r = np.round(irs, 3).tolist()
+
+    raws_cash = []
+    raws_fut = []
+    raws_opt = []
+    zscores = []
+    regimes = []
+
+    for i, trade_date in enumerate(dates):
 
         # -------------------------
-        # Insert raw
+        # Raw rows
         # -------------------------
-        upsert("fii_cash_raw", {
-            "trade_date": str(trade_date),
+        raws_cash.append({
+            "trade_date": trade_date,
             "fii_buy": 0,
             "fii_sell": 0,
-            "fii_net": fii_net
+            "fii_net": fii_net_l[i]
         })
 
-        upsert("index_futures_raw", {
-            "trade_date": str(trade_date),
-            "net_position": net_position,
-            "oi": oi_change,
-            "oi_change": oi_change
+        raws_fut.append({
+            "trade_date": trade_date,
+            "net_position": net_position_l[i],
+            "oi": oi_change_l[i],
+            "oi_change": oi_change_l[i]
         })
 
-        upsert("options_summary_raw", {
-            "trade_date": str(trade_date),
+        raws_opt.append({
+            "trade_date": trade_date,
             "total_call_oi": 0,
             "total_put_oi": 0,
-            "pcr": pcr_today
+            "pcr": pcr_l[i]
         })
 
-        # -------------------------
-        # Fetch history up to that date
-        # -------------------------
-        cash_hist = fetch_last_n("fii_cash_raw", "fii_net", 30)
-        pos_hist = fetch_last_n("index_futures_raw", "net_position", 30)
-        oi_hist = fetch_last_n("index_futures_raw", "oi_change", 30)
-        pcr_hist = fetch_last_n("options_summary_raw", "pcr", 30)
-
-        if min(len(cash_hist), len(pos_hist), len(oi_hist), len(pcr_hist)) < 30:
-            logging.info(f"Skipping {trade_date} (insufficient history)")
+        if not valid[i]:
+            logger.info("Skipping %s (insufficient history)", trade_date)
             continue
 
-        # -------------------------
-        # Calculate signals
-        # -------------------------
-        cash_z = calculate_z_score(fii_net, cash_hist)
-        position_z = calculate_z_score(net_position, pos_hist)
-        oi_z = calculate_z_score(oi_change, oi_hist)
-        pcr_z = calculate_z_score(pcr_today, pcr_hist)
-
-        futures_z = calculate_futures_z(position_z, oi_z)
-        sts = calculate_sts(futures_z, cash_z, pcr_z)
-
-        if previous_irs is None:
-            irs = sts
-        else:
-            irs = calculate_ema(sts, previous_irs)
-
-        previous_irs = irs
-
-        bias = classify_bias(sts)
-        phase = classify_phase(irs)
-
-        upsert("institutional_zscores", {
-            "trade_date": str(trade_date),
-            "cash_z": round(cash_z, 3),
-            "futures_z": round(futures_z, 3),
-            "pcr_z": round(pcr_z, 3),
-            "sts": round(sts, 3)
+        zscores.append({
+            "trade_date": trade_date,
+            "cash_z": cash_z_r[i],
+            "futures_z": futures_z_r[i],
+            "pcr_z": pcr_z_r[i],
+            "sts": sts_r[i]
         })
 
-        upsert("institutional_regime", {
-            "trade_date": str(trade_date),
-            "sts": round(sts, 3),
-            "irs": round(irs, 3),
-            "market_phase": phase,
-            "tomorrow_bias": bias
+        regimes.append({
+            "trade_date": trade_date,
+            "sts": sts_r[i],
+            "irs": irs_r[i],
+            "market_phase": phase[i],
+            "tomorrow_bias": bias[i]
         })
 
-        logging.info(f"Processed {trade_date}")
+    # -------------------------
+    # Store everything, one batch per table
+    # -------------------------
+    upsert_many("fii_cash_raw", raws_cash)
+    upsert_many("index_futures_raw", raws_fut)
+    upsert_many("options_summary_raw", raws_opt)
+    upsert_many("institutional_zscores", zscores)
+    upsert_many("institutional_regime", regimes)
 
+    logger.info("Processed %s of %s rows", len(zscores), len(df))
 
 if __name__ == "__main__":
     backfill_from_csv("historical_data.csv")
\ No newline at end of file
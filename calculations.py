@@ -1,8 +1,12 @@
 import numpy as np
 
+from _njit import njit
+
 def calculate_z_score(today_value, historical_values):
-    mean = np.mean(historical_values)
-    std = np.std(historical_values)
+    # Convert once; np.mean / np.std on a list would each convert it again
+    values = np.asarray(historical_values, dtype=np.float64)
+    mean = values.mean()
+    std = values.std()
 
     if std == 0:
         return 0
@@ -22,4 +26,105 @@ def calculate_sts(futures_z, cash_z, pcr_z):
 
 def calculate_ema(current_value, previous_ema, period=10):
     alpha = 2 / (period + 1)
-    return (current_value * alpha) + (previous_ema * (1 - alpha))
\ No newline at end of file
+    return (current_value * alpha) + (previous_ema * (1 - alpha))
+
+
+# ----------------------------------------------------------
+# Series versions of the above, for backfills. Leading NaNs
+# mark missing history; outputs are NaN until a full window.
+# ----------------------------------------------------------
+
+@njit(cache=True)
+def _rolling_z(x, window):
+    # Written as whole-array NumPy so it stays fast when numba is absent
+    n = x.shape[0]
+    z = np.full(n, np.nan)
+
+    start = 0
+    while start < n and np.isnan(x[start]):
+        start += 1
+
+    if n - start < window:
+        return z
+
+    # Window sums as differences of running sums
+    v = x[start:]
+    c = np.zeros(v.shape[0] + 1)
+    c2 = np.zeros(v.shape[0] + 1)
+    c[1:] = np.cumsum(v)
+    c2[1:] = np.cumsum(v * v)
+
+    mean = (c[window:] - c[:-window]) / window
+    var = (c2[window:] - c2[:-window]) / window - mean * mean
+
+    # Flat windows score 0. Test them exactly (no value changes inside the
+    # window): the running-sum variance of a constant run like 0.93 comes
+    # out as rounding noise rather than 0.
+    changes = np.zeros(v.shape[0])
+    changes[1:] = np.cumsum((v[1:] != v[:-1]) * 1.0)
+    flat = (changes[window - 1:] == changes[:v.shape[0] - window + 1]) | (var <= 0)
+
+    # Guard the divide so NumPy does not warn on flat windows
+    std = np.sqrt(np.where(flat, 1.0, var))
+    scores = np.minimum(np.maximum((v[window - 1:] - mean) / std, -3.0), 3.0)
+
+    z[start + window - 1:] = np.where(flat, 0.0, scores)
+
+    return z
+
+
+@njit(cache=True)
+def _ema(x, alpha):
+    # First-order IIR: y[i] = alpha * x[i] + (1 - alpha) * y[i - 1].
+    # NaN inputs are skipped; the filter is seeded with the first real value.
+    n = x.shape[0]
+    y = np.full(n, np.nan)
+
+    previous = np.nan
+
+    for i in range(n):
+        if np.isnan(x[i]):
+            continue
+
+        if np.isnan(previous):
+            y[i] = x[i]
+        else:
+            y[i] = (x[i] * alpha) + (previous * (1 - alpha))
+
+        previous = y[i]
+
+    return y
+
+
+@njit(cache=True)
+def _pipeline(fii, pos, oi, pcr, window):
+    cash_z = _rolling_z(fii, window)
+    position_z = _rolling_z(pos, window)
+    oi_z = _rolling_z(oi, window)
+    pcr_z = _rolling_z(pcr, window)
+
+    futures_z = (position_z * 0.6) + (oi_z * 0.4)
+    sts = (futures_z * 0.50) + (cash_z * 0.30) + (pcr_z * 0.20)
+    sts = np.minimum(np.maximum(sts, -3.0), 3.0)
+
+    return cash_z, futures_z, pcr_z, sts
+
+
+def calculate_ema_series(values, period=10):
+    """
+    Returns the EMA of a series, seeded with its first non-NaN value.
+    """
+    return _ema(np.asarray(values, dtype=np.float64), 2 / (period + 1))
+
+
+def calculate_signal_series(fii_net, net_position, oi_change, pcr, window=30):
+    """
+    Returns (cash_z, futures_z, pcr_z, sts) arrays for aligned input series.
+    """
+    return _pipeline(
+        np.asarray(fii_net, dtype=np.float64),
+        np.asarray(net_position, dtype=np.float64),
+        np.asarray(oi_change, dtype=np.float64),
+        np.asarray(pcr, dtype=np.float64),
+        window,
+    )
\ No newline at end of file
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def classify_bias(sts):
     if sts > 2:
         return "Strong Bullish"
@@ -19,4 +22,46 @@ def classify_phase(irs):
         return "Distribution"
     elif irs < -0.5:
         return "Bearish Bias"
-    return "Transition"
\ No newline at end of file
+    return "Transition"
+
+# Keyed by (sign of FII net, sign of DII net); any zero is "Neutral Flow"
+FLOW_STRUCTURES = {
+    (1, 1): "Institutional Accumulation",
+    (1, -1): "Foreign Accumulation | Domestic Distribution",
+    (-1, 1): "Domestic Absorption",
+    (-1, -1): "Institutional Distribution",
+}
+
+
+def _sign(x):
+    return (x > 0) - (x < 0)
+
+
+def classify_flow_structure(fii_net, dii_net):
+    return FLOW_STRUCTURES.get((_sign(fii_net), _sign(dii_net)), "Neutral Flow")
+
+
+# ----------------------------------------------------------
+# Array versions for backfills: one lookup per row instead of
+# an if/elif chain. Lower thresholds are inclusive and upper ones
+# exclusive, matching the scalar functions above.
+# ----------------------------------------------------------
+
+BIAS_LABELS = np.array(["Strong Bearish", "Bearish", "Neutral", "Bullish", "Strong Bullish"])
+PHASE_LABELS = np.array(["Distribution", "Bearish Bias", "Transition", "Bullish Bias", "Accumulation"])
+
+
+def _band(values, lower, upper):
+    values = np.asarray(values, dtype=np.float64)
+    return (
+        np.searchsorted(lower, values, side="right")
+        + np.searchsorted(upper, values, side="left")
+    )
+
+
+def classify_bias_series(sts):
+    return BIAS_LABELS[_band(sts, [-2, -1], [1, 2])].tolist()
+
+
+def classify_phase_series(irs):
+    return PHASE_LABELS[_band(irs, [-1.5, -0.5], [0.5, 1.5])].tolist()
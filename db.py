@@ -1,11 +1,39 @@
-from supabase import create_client
+import httpx
+from supabase import ClientOptions, create_client
 from config import SUPABASE_URL, SUPABASE_KEY
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# One keep-alive HTTP/2 pool shared by every request this process makes
+_http_client = httpx.Client(
+    http2=True,
+    timeout=120,
+    follow_redirects=True,
+    limits=httpx.Limits(max_keepalive_connections=10),
+)
+
+supabase = create_client(
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    options=ClientOptions(httpx_client=_http_client),
+)
+
+UPSERT_CHUNK_SIZE = 500
 
 def upsert(table, data):
     return supabase.table(table).upsert(data).execute()
 
+def upsert_rows(rows_by_table):
+    """
+    Upserts {table: [rows]} in one request and one transaction via the
+    upsert_rows RPC (migrations/004). Returns {table: [stored rows]}.
+    """
+    response = supabase.rpc("upsert_rows", {"payload": rows_by_table}).execute()
+    return response.data or {}
+
+def upsert_many(table, rows, chunk_size=UPSERT_CHUNK_SIZE):
+    # One request per chunk keeps large backfills under the payload cap.
+    for start in range(0, len(rows), chunk_size):
+        upsert(table, rows[start:start + chunk_size])
+
 def fetch_last_n(table, column, n):
     response = (
         supabase.table(table)
@@ -18,4 +46,41 @@ def fetch_last_n(table, column, n):
     if not response.data:
         return []
 
-    return [row[column] for row in response.data]
\ No newline at end of file
+    return [row[column] for row in response.data]
+
+def fetch_last_n_before(table, columns, before, n):
+    """
+    Latest `n` rows strictly before `before`, oldest first, as
+    {column: [values]}. One request regardless of how many columns.
+    """
+    response = (
+        supabase.table(table)
+        .select(",".join(columns))
+        .lt("trade_date", str(before))
+        .order("trade_date", desc=True)
+        .limit(n)
+        .execute()
+    )
+
+    rows = list(reversed(response.data or []))
+
+    return {column: [row[column] for row in rows] for column in columns}
+
+def fetch_signal_history(n, before=None):
+    """
+    Last `n` cash / futures position / OI change / PCR values, newest
+    first, via the get_signal_history RPC (migrations/001, 004, 005).
+    With `before`, only rows strictly before that date are considered.
+    "latest_cash" is the newest stored fii_net regardless of `before`.
+    """
+    params = {"n": n}
+    if before is not None:
+        params["before_date"] = str(before)
+
+    response = supabase.rpc("get_signal_history", params).execute()
+    data = response.data or {}
+
+    history = {key: data.get(key) or [] for key in ("cash", "pos", "oi", "pcr")}
+    history["latest_cash"] = data.get("latest_cash")
+
+    return history
@@ -2,12 +2,18 @@
 from __future__ import annotations
 
 import logging
+import os
 import random
 import time
 from dataclasses import dataclass
 from typing import Any, Dict, Optional, Tuple
 
+import numpy as np
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
 
 BASE_URL = "https://www.nseindia.com"
 
@@ -27,6 +33,18 @@ DEFAULT_HEADERS = {
 MAX_RETRIES = 4
 INITIAL_DELAY_SEC = 1.5
 TIMEOUT_SEC = 15
+POOL_SIZE = 4
+
+# Warm-up cookies are reused across runs while younger than this.
+# Only repeated runs on the same machine benefit (local runs, backfills):
+# the daily Render cron starts from a fresh filesystem each time and
+# always warms up.
+COOKIE_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "institutional-engine",
+    "nse_cookies.json",
+)
+COOKIE_CACHE_TTL_SEC = 3600
 
 
 @dataclass(frozen=True)
@@ -37,16 +55,14 @@ class NSEClient:
     def create() -> "NSEClient":
         """
         Creates a session and warms it up to establish cookies.
+        Cookies from a recent run are reused instead of warming up again.
         """
         s = requests.Session()
         s.headers.update(DEFAULT_HEADERS)
+        s.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
 
-        # Warm-up request to set cookies. NSE sometimes blocks direct API calls without this.
-        try:
-            s.get(BASE_URL, timeout=TIMEOUT_SEC)
-        except Exception as e:
-            # Not fatal; we still proceed.
-            logging.warning(f"NSE warm-up request failed (non-fatal): {e}")
+        if not _load_cookies(s):
+            _warm_up(s)
 
         return NSEClient(session=s)
 
@@ -59,11 +75,18 @@ class NSEClient:
         delay = INITIAL_DELAY_SEC
 
         last_err: Optional[Exception] = None
+        rewarmed = False
 
         for attempt in range(1, MAX_RETRIES + 1):
             try:
                 resp = self.session.get(url, timeout=TIMEOUT_SEC)
 
+                # 403 usually means the (possibly cached) cookies have expired:
+                # refresh them once so the next attempt can succeed.
+                if resp.status_code == 403 and not rewarmed:
+                    _warm_up(self.session)
+                    rewarmed = True
+
                 # Typical NSE blocks / throttling
                 if resp.status_code in (403, 429):
                     raise RuntimeError(f"{resp.status_code} blocked/throttled by NSE")
@@ -71,20 +94,16 @@ class NSEClient:
                 resp.raise_for_status()
 
                 # NSE occasionally returns HTML (cloudflare / block page).
-                ctype = (resp.headers.get("Content-Type") or "").lower()
-                if "application/json" not in ctype:
-                    # Still try json parsing, but if it fails, raise a clear error
-                    try:
-                        return resp.json()
-                    except Exception:
-                        snippet = resp.text[:200].replace("\n", " ")
-                        raise RuntimeError(f"Non-JSON response from NSE: {ctype} | {snippet}")
-
-                return resp.json()
+                # Parse the raw bytes once; only the error path looks at them again.
+                try:
+                    return orjson.loads(resp.content)
+                except orjson.JSONDecodeError:
+                    ctype = resp.headers.get("Content-Type") or ""
+                    raise RuntimeError(f"Non-JSON response from NSE: {ctype} | {resp.content[:200]!r}")
 
             except Exception as e:
                 last_err = e
-                logging.warning(f"NSE request failed ({attempt}/{MAX_RETRIES}) {url}: {e}")
+                logger.warning("NSE request failed (%s/%s) %s: %s", attempt, MAX_RETRIES, url, e)
 
                 if attempt == MAX_RETRIES:
                     break
@@ -98,11 +117,66 @@ class NSEClient:
         raise last_err if last_err else RuntimeError("Unknown NSE request failure")
 
 
+def _warm_up(session: requests.Session) -> None:
+    # Warm-up request to set cookies. NSE sometimes blocks direct API calls without this.
+    try:
+        session.get(BASE_URL, timeout=TIMEOUT_SEC).raise_for_status()
+        _save_cookies(session)
+    except Exception as e:
+        # Not fatal; we still proceed.
+        logger.warning("NSE warm-up request failed (non-fatal): %s", e)
+
+
+def _load_cookies(session: requests.Session) -> bool:
+    try:
+        if time.time() - os.path.getmtime(COOKIE_CACHE_PATH) >= COOKIE_CACHE_TTL_SEC:
+            return False
+        with open(COOKIE_CACHE_PATH, "rb") as f:
+            cookies = orjson.loads(f.read())
+        for c in cookies:
+            session.cookies.set(c["name"], c["value"], domain=c["domain"], path=c["path"])
+        return True
+    except Exception:
+        # Missing, stale or unreadable cache: just warm up normally.
+        return False
+
+
+def _save_cookies(session: requests.Session) -> None:
+    cookies = [
+        {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+        for c in session.cookies
+    ]
+    try:
+        # Private to this user: the cache holds session cookies
+        os.makedirs(os.path.dirname(COOKIE_CACHE_PATH), mode=0o700, exist_ok=True)
+        fd = os.open(COOKIE_CACHE_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(orjson.dumps(cookies))
+    except Exception as e:
+        logger.warning("Could not cache NSE cookies (non-fatal): %s", e)
+
+
+_shared_client: Optional[NSEClient] = None
+
+
+def shared_client() -> NSEClient:
+    """
+    Process-wide client, created (and warmed up) on first use so every
+    fetcher reuses the same cookies and keep-alive connections.
+    """
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = NSEClient.create()
+    return _shared_client
+
+
 # -------------------------------------------------------------------
 # Helpers
 # -------------------------------------------------------------------
 
 def _to_float(x: Any) -> float:
+    if isinstance(x, (int, float)):
+        return float(x)
     if x is None:
         return 0.0
     try:
@@ -115,6 +189,19 @@ def _to_float(x: Any) -> float:
             return 0.0
 
 
+def _sum_open_interest(strikes: list, side: str) -> int:
+    # orjson already yields numbers for the option chain; no per-strike _to_float
+    oi = np.fromiter(
+        (
+            strike[side].get("openInterest") or 0
+            for strike in strikes
+            if isinstance(strike.get(side), dict)
+        ),
+        dtype=np.float64,
+    )
+    return int(oi.astype(np.int64).sum())
+
+
 def _normalize_category(cat: Any) -> str:
     return str(cat or "").strip().upper()
 
@@ -130,7 +217,7 @@ def fetch_institutional_cash(client: Optional[NSEClient] = None) -> Tuple[float,
 
     Source: /api/fiidiiTradeReact (same as your NSE excel view)
     """
-    c = client or NSEClient.create()
+    c = client or shared_client()
     data = c.get_json("/api/fiidiiTradeReact")
 
     if not isinstance(data, list):
@@ -182,7 +269,7 @@ def fetch_fii_futures(client: Optional[NSEClient] = None) -> Tuple[int, int]:
     Source: /api/participant-wise-oi-data
     Note: NSE endpoint availability can change; your main.py already has fallback.
     """
-    c = client or NSEClient.create()
+    c = client or shared_client()
     payload = c.get_json("/api/participant-wise-oi-data")
 
     if not isinstance(payload, dict) or "data" not in payload:
@@ -218,7 +305,7 @@ def fetch_index_pcr(client: Optional[NSEClient] = None, symbol: str = "NIFTY") -
 
     Source: /api/option-chain-indices?symbol=NIFTY
     """
-    c = client or NSEClient.create()
+    c = client or shared_client()
     payload = c.get_json(f"/api/option-chain-indices?symbol={symbol}")
 
     records = payload.get("records") if isinstance(payload, dict) else None
@@ -226,17 +313,27 @@ def fetch_index_pcr(client: Optional[NSEClient] = None, symbol: str = "NIFTY") -
     if not isinstance(data, list):
         raise RuntimeError("Unexpected option chain payload shape")
 
-    total_call_oi = 0
-    total_put_oi = 0
+    total_call_oi = _sum_open_interest(data, "CE")
+    total_put_oi = _sum_open_interest(data, "PE")
 
-    for strike in data:
-        ce = strike.get("CE")
-        pe = strike.get("PE")
+    pcr = (total_put_oi / total_call_oi) if total_call_oi else 1.0
+    return total_call_oi, total_put_oi, round(pcr, 3)
 
-        if isinstance(ce, dict):
-            total_call_oi += int(_to_float(ce.get("openInterest")))
-        if isinstance(pe, dict):
-            total_put_oi += int(_to_float(pe.get("openInterest")))
+# -------------------------------------------------------------------
+# Legacy session-per-call API
+# -------------------------------------------------------------------
 
-    pcr = (total_put_oi / total_call_oi) if total_call_oi else 1.0
-    return total_call_oi, total_put_oi, round(pcr, 3)
\ No newline at end of file
+def create_session() -> requests.Session:
+    """
+    Backward-compatible alias for the old session-per-call module.
+    Returns the shared client's (already warmed-up) session.
+    """
+    return shared_client().session
+
+
+def safe_get_json(session: requests.Session, url: str) -> Any:
+    """
+    Backward-compatible alias: GET `url` with NSEClient's retry logic.
+    """
+    path = url[len(BASE_URL):] if url.startswith(BASE_URL) else url
+    return NSEClient(session=session).get_json(path)
@@ -1,60 +1,74 @@
 import datetime
 import logging
+from collections import deque
 
-from db import upsert, fetch_last_n
+from db import upsert, fetch_last_n_before
 from calculations import calculate_z_score, calculate_ema
 from classification import classify_bias, classify_phase
-from fetch_nse import create_session, safe_get_json
+from fetch_nse import shared_client
 
-BASE_URL = "https://www.nseindia.com"
+WINDOW = 30
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+logger = logging.getLogger(__name__)
+
+
+def _parse_date(value):
+    return datetime.datetime.strptime(value, "%d-%b-%Y").date()
+
 
 def fetch_full_fii_history():
-    session = create_session()
-    url = BASE_URL + "/api/fiidiiTradeReact"
-    data = safe_get_json(session, url)
+    data = shared_client().get_json("/api/fiidiiTradeReact")
     return list(reversed(data))  # oldest first
 
 
 def run_backfill():
 
-    fii_history = fetch_full_fii_history()
+    fii_history = [
+        entry for entry in fetch_full_fii_history()
+        if entry.get("category") == "FII/FPI"
+    ]
+
+    if not fii_history:
+        logger.info("No FII/FPI rows to backfill.")
+        return
+
+    # Rolling 30-day cash history: load what precedes the run once,
+    # then slide it locally instead of re-reading it after every upsert.
+    first_date = _parse_date(fii_history[0]["date"])
+    prior = fetch_last_n_before("fii_cash_raw", ["fii_net"], first_date, WINDOW)
+    cash_hist = deque(prior["fii_net"], maxlen=WINDOW)
+
     previous_irs = None
 
     for entry in fii_history:
 
-        if entry.get("category") != "FII/FPI":
-            continue
-
-        trade_date = datetime.datetime.strptime(
-            entry["date"], "%d-%b-%Y"
-        ).date()
+        trade_date = _parse_date(entry["date"])
+        td_str = str(trade_date)
 
         fii_net = float(entry["netValue"])
 
-        logging.info(f"Processing {trade_date}")
+        logger.info("Processing %s", trade_date)
 
         # Insert raw cash
         upsert("fii_cash_raw", {
-            "trade_date": str(trade_date),
+            "trade_date": td_str,
             "fii_buy": float(entry["buyValue"]),
             "fii_sell": float(entry["sellValue"]),
             "fii_net": fii_net
         })
 
-        # Fetch rolling 30-day cash history
-        cash_hist = fetch_last_n("fii_cash_raw", "fii_net", 30)
+        cash_hist.append(fii_net)
 
-        if len(cash_hist) < 30:
-            logging.info(f"Skipping {trade_date} (insufficient history)")
+        if len(cash_hist) < WINDOW:
+            logger.info("Skipping %s (insufficient history)", trade_date)
             continue
 
-        cash_z = calculate_z_score(fii_net, cash_hist)
+        cash_z = calculate_z_score(fii_net, list(cash_hist))
 
         # For seeding, STS = cash_z only
         sts = cash_z
@@ -69,25 +83,28 @@ def run_backfill():
         bias = classify_bias(sts)
         phase = classify_phase(irs)
 
+        # cash_z is the STS here, so one rounded value serves all three fields
+        sts_r = round(sts, 3)
+
         upsert("institutional_zscores", {
-            "trade_date": str(trade_date),
-            "cash_z": round(cash_z, 3),
+            "trade_date": td_str,
+            "cash_z": sts_r,
             "futures_z": 0,
             "pcr_z": 0,
-            "sts": round(sts, 3)
+            "sts": sts_r
         })
 
         upsert("institutional_regime", {
-            "trade_date": str(trade_date),
-            "sts": round(sts, 3),
+            "trade_date": td_str,
+            "sts": sts_r,
             "irs": round(irs, 3),
             "market_phase": phase,
             "tomorrow_bias": bias
         })
 
-        logging.info(f"Completed {trade_date}")
+        logger.info("Completed %s", trade_date)
 
-    logging.info("Cash-only backfill completed successfully.")
+    logger.info("Cash-only backfill completed successfully.")
 
 
 if __name__ == "__main__":
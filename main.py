@@ -1,22 +1,10 @@
 import datetime
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-from db import upsert, fetch_last_n
-from calculations import (
-    calculate_z_score,
-    calculate_futures_z,
-    calculate_sts,
-    calculate_ema
-)
-from classification import classify_phase
-from telegram import send_message
-from fetch_nse import (
-    NSEClient,
-    fetch_institutional_cash,
-    fetch_fii_futures,
-    fetch_index_pcr
-)
+# Project modules are imported inside run(), after the weekend check,
+# so weekend runs exit without loading the Supabase client or NumPy.
 
 # ==========================================================
 # Logging Setup
@@ -28,97 +16,134 @@ logging.basicConfig(
     stream=sys.stdout
 )
 
+logger = logging.getLogger(__name__)
+
 
 def run():
 
     today = datetime.date.today()
-    logging.info(f"Starting Institutional Engine for {today}")
+    today_str = str(today)
+    today_fmt = today.strftime("%d %b %Y")
 
-    # ==========================================================
-    # 1️⃣ FETCH LIVE NSE DATA (Single Session)
-    # ==========================================================
+    logger.info("Starting Institutional Engine for %s", today)
 
-    client = NSEClient.create()
+    # No NSE session on weekends: nothing new to fetch or send
+    if today.weekday() >= 5:
+        logger.info("Weekend. Skipping run.")
+        return
 
-    fii_buy, fii_sell, fii_net, dii_buy, dii_sell, dii_net = fetch_institutional_cash(client)
-    combined_net = fii_net + dii_net
+    from db import upsert_rows, fetch_signal_history
+    from fetch_nse import (
+        shared_client,
+        fetch_institutional_cash,
+        fetch_fii_futures,
+        fetch_index_pcr
+    )
+    from calculations import (
+        calculate_z_score,
+        calculate_futures_z,
+        calculate_sts
+    )
+    from classification import classify_flow_structure
+    from telegram import send_message
 
     # ==========================================================
-    # PREVENT DUPLICATE SEND (Send only when data changes)
+    # 1️⃣ FETCH LIVE NSE DATA + STORED HISTORY (concurrent requests)
     # ==========================================================
 
-    existing_today = fetch_last_n("fii_cash_raw", "fii_net", 1)
+    client = shared_client()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        cash_job = pool.submit(fetch_institutional_cash, client)
+
+        # Everything run() reads from the DB, in one round-trip: history
+        # strictly before today (today's values are appended in step 3)
+        # plus the latest stored fii_net for the duplicate check.
+        history_job = pool.submit(fetch_signal_history, 29, today)
+
+        fii_buy, fii_sell, fii_net, dii_buy, dii_sell, dii_net = cash_job.result()
+        history = history_job.result()
+
+        # ==========================================================
+        # PREVENT DUPLICATE SEND (Send only when data changes)
+        # ==========================================================
+
+        # Checked before the futures / PCR requests so no-op runs skip them
+        last_stored_net = history["latest_cash"]
+
+        if last_stored_net is not None:
+            if round(last_stored_net, 2) == round(fii_net, 2):
+                logger.info("FII data unchanged. Skipping Telegram send.")
+                return
 
-    if existing_today:
-        last_stored_net = existing_today[0]
-        if round(last_stored_net, 2) == round(fii_net, 2):
-            logging.info("FII data unchanged. Skipping Telegram send.")
-            return
+        futures_job = pool.submit(fetch_fii_futures, client)
+        pcr_job = pool.submit(fetch_index_pcr, client)
+
+    combined_net = fii_net + dii_net
 
     # ---- Futures Fetch ----
     try:
-        net_position, total_oi = fetch_fii_futures(client)
+        net_position, total_oi = futures_job.result()
     except Exception:
-        logging.warning("Futures fetch failed. Using neutral fallback.")
+        logger.warning("Futures fetch failed. Using neutral fallback.")
         net_position = 0
         total_oi = 0
 
     # ---- PCR Fetch ----
     try:
-        total_call_oi, total_put_oi, pcr_today = fetch_index_pcr(client)
+        total_call_oi, total_put_oi, pcr_today = pcr_job.result()
     except Exception:
-        logging.warning("PCR fetch failed. Using neutral fallback.")
+        logger.warning("PCR fetch failed. Using neutral fallback.")
         total_call_oi = 0
         total_put_oi = 0
         pcr_today = 1
 
-    logging.info("NSE data fetched successfully")
-
-    # ==========================================================
-    # 2️⃣ STORE RAW DATA
-    # ==========================================================
-
-    upsert("fii_cash_raw", {
-        "trade_date": str(today),
-        "fii_buy": fii_buy,
-        "fii_sell": fii_sell,
-        "fii_net": fii_net
-    })
-
-    upsert("dii_cash_raw", {
-        "trade_date": str(today),
-        "dii_buy": dii_buy,
-        "dii_sell": dii_sell,
-        "dii_net": dii_net
-    })
-
-    upsert("index_futures_raw", {
-        "trade_date": str(today),
-        "net_position": net_position,
-        "oi": total_oi,
-        "oi_change": total_oi
-    })
-
-    upsert("options_summary_raw", {
-        "trade_date": str(today),
-        "total_call_oi": total_call_oi,
-        "total_put_oi": total_put_oi,
-        "pcr": pcr_today
-    })
-
-    logging.info("Raw data stored successfully")
+    logger.info("NSE data fetched successfully")
+
+    # ==========================================================
+    # 2️⃣ RAW DATA (written with the derived rows in step 5)
+    # ==========================================================
+
+    rows = {
+        "fii_cash_raw": [{
+            "trade_date": today_str,
+            "fii_buy": fii_buy,
+            "fii_sell": fii_sell,
+            "fii_net": fii_net
+        }],
+        "dii_cash_raw": [{
+            "trade_date": today_str,
+            "dii_buy": dii_buy,
+            "dii_sell": dii_sell,
+            "dii_net": dii_net
+        }],
+        "index_futures_raw": [{
+            "trade_date": today_str,
+            "net_position": net_position,
+            "oi": total_oi,
+            "oi_change": total_oi
+        }],
+        "options_summary_raw": [{
+            "trade_date": today_str,
+            "total_call_oi": total_call_oi,
+            "total_put_oi": total_put_oi,
+            "pcr": pcr_today
+        }],
+    }
 
     # ==========================================================
     # 3️⃣ FETCH HISTORICAL DATA
     # ==========================================================
 
-    cash_hist = fetch_last_n("fii_cash_raw", "fii_net", 30)
-    pos_hist = fetch_last_n("index_futures_raw", "net_position", 30)
-    oi_hist = fetch_last_n("index_futures_raw", "oi_change", 30)
-    pcr_hist = fetch_last_n("options_summary_raw", "pcr", 30)
+    # Stored history before today, plus today's not-yet-written values
+    cash_hist = [fii_net] + history["cash"]
+    pos_hist = [net_position] + history["pos"]
+    oi_hist = [total_oi] + history["oi"]
+    pcr_hist = [pcr_today] + history["pcr"]
 
     if min(len(cash_hist), len(pos_hist), len(oi_hist), len(pcr_hist)) < 20:
-        logging.warning("Insufficient historical data.")
+        upsert_rows(rows)
+        logger.warning("Insufficient historical data.")
         return
 
     # ==========================================================
@@ -133,61 +158,64 @@ def run():
     futures_z = calculate_futures_z(position_z, oi_z)
     sts = calculate_sts(futures_z, cash_z, pcr_z)
 
-    previous_irs_list = fetch_last_n("institutional_regime", "irs", 1)
-    previous_irs = previous_irs_list[0] if previous_irs_list else sts
-
-    irs = calculate_ema(sts, previous_irs, period=10)
-    phase = classify_phase(irs)
-
-    logging.info("Signals calculated")
+    logger.info("Signals calculated")
 
     # ==========================================================
-    # 5️⃣ STORE DERIVED DATA
+    # 5️⃣ STORE RAW + DERIVED DATA (one request, one transaction)
     # ==========================================================
 
-    upsert("institutional_zscores", {
-        "trade_date": str(today),
-        "cash_z": round(cash_z, 3),
-        "futures_z": round(futures_z, 3),
-        "pcr_z": round(pcr_z, 3),
-        "sts": round(sts, 3)
-    })
+    cash_z_r = round(cash_z, 3)
+    futures_z_r = round(futures_z, 3)
+    pcr_z_r = round(pcr_z, 3)
+    sts_r = round(sts, 3)
+
+    rows["institutional_zscores"] = [{
+        "trade_date": today_str,
+        "cash_z": cash_z_r,
+        "futures_z": futures_z_r,
+        "pcr_z": pcr_z_r,
+        "sts": sts_r
+    }]
+
+    # IRS (EMA of STS) and phase are filled in by the compute_irs trigger
+    # (migrations/003) and come back with the stored row.
+    rows["institutional_regime"] = [{
+        "trade_date": today_str,
+        "sts": sts_r,
+        "irs": None,
+        "market_phase": None
+    }]
 
-    upsert("institutional_regime", {
-        "trade_date": str(today),
-        "sts": round(sts, 3),
-        "irs": round(irs, 3),
-        "market_phase": phase
-    })
+    stored = upsert_rows(rows)
+    regime = stored["institutional_regime"][0]
 
-    logging.info("Derived data stored successfully")
+    irs = float(regime["irs"])
+    phase = regime["market_phase"]
+
+    logger.info("Raw and derived data stored successfully")
 
     # ==========================================================
     # 6️⃣ FLOW STRUCTURE CLASSIFICATION
     # ==========================================================
 
-    if fii_net > 0 and dii_net > 0:
-        flow_structure = "Institutional Accumulation"
-    elif fii_net > 0 and dii_net < 0:
-        flow_structure = "Foreign Accumulation | Domestic Distribution"
-    elif fii_net < 0 and dii_net > 0:
-        flow_structure = "Domestic Absorption"
-    elif fii_net < 0 and dii_net < 0:
-        flow_structure = "Institutional Distribution"
-    else:
-        flow_structure = "Neutral Flow"
+    flow_structure = classify_flow_structure(fii_net, dii_net)
 
     # ==========================================================
     # 7️⃣ TELEGRAM MESSAGE
     # ==========================================================
 
+    # Whole crores: integer grouping skips float decimal formatting
+    fii_s = f"{int(round(fii_net)):,}"
+    dii_s = f"{int(round(dii_net)):,}"
+    combined_s = f"{int(round(combined_net)):,}"
+
     message = f"""
 🏛 Institutional Flow Dashboard
-Date: {today.strftime("%d %b %Y")}
+Date: {today_fmt}
 
-💰 FII Net: ₹{fii_net:,.0f} Cr
-🏦 DII Net: ₹{dii_net:,.0f} Cr
-🔁 Combined Net: ₹{combined_net:,.0f} Cr
+💰 FII Net: ₹{fii_s} Cr
+🏦 DII Net: ₹{dii_s} Cr
+🔁 Combined Net: ₹{combined_s} Cr
 
 ───────────────
 📊 Cash Z: {cash_z:.2f}
@@ -205,7 +233,7 @@ For informational purposes only.
 """
 
     send_message(message)
-    logging.info("Telegram report sent successfully")
+    logger.info("Telegram report sent successfully")
 
 
 # ==========================================================
@@ -216,8 +244,11 @@ if __name__ == "__main__":
     try:
         run()
     except Exception as e:
-        logging.exception("Institutional Engine Failed")
+        logger.exception("Institutional Engine Failed")
         try:
-            send_message(f"⚠ Institutional Engine Failed:\n{str(e)}")
+            from telegram import send_message
+
+            # Plain text: exception messages often contain Markdown metacharacters
+            send_message(f"⚠ Institutional Engine Failed:\n{str(e)}", parse_mode=None)
         except Exception:
             pass
\ No newline at end of file
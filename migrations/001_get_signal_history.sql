@@ -0,0 +1,27 @@
+-- Last n values of every series run() z-scores against, newest first,
+-- in one round-trip: {"cash": [...], "pos": [...], "oi": [...], "pcr": [...]}.
+
+CREATE OR REPLACE FUNCTION get_signal_history(n int)
+RETURNS json
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'cash', (
+            SELECT coalesce(json_agg(fii_net ORDER BY trade_date DESC), '[]'::json)
+            FROM (SELECT trade_date, fii_net FROM fii_cash_raw ORDER BY trade_date DESC LIMIT n) s
+        ),
+        'pos', (
+            SELECT coalesce(json_agg(net_position ORDER BY trade_date DESC), '[]'::json)
+            FROM (SELECT trade_date, net_position FROM index_futures_raw ORDER BY trade_date DESC LIMIT n) s
+        ),
+        'oi', (
+            SELECT coalesce(json_agg(oi_change ORDER BY trade_date DESC), '[]'::json)
+            FROM (SELECT trade_date, oi_change FROM index_futures_raw ORDER BY trade_date DESC LIMIT n) s
+        ),
+        'pcr', (
+            SELECT coalesce(json_agg(pcr ORDER BY trade_date DESC), '[]'::json)
+            FROM (SELECT trade_date, pcr FROM options_summary_raw ORDER BY trade_date DESC LIMIT n) s
+        )
+    );
+$$;
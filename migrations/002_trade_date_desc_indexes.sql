@@ -0,0 +1,42 @@
+-- Every history read is ORDER BY trade_date DESC LIMIT n. Give each table
+-- an index whose leading column is trade_date so that is an index scan
+-- instead of a full sort.
+--
+-- Tables whose primary key is trade_date (the usual case, since upserts
+-- conflict on it) already have one: Postgres scans it backwards. Only
+-- tables without such an index get a new one, so writes don't pay for a
+-- duplicate.
+--
+-- Check with:
+--   EXPLAIN ANALYZE SELECT fii_net FROM fii_cash_raw ORDER BY trade_date DESC LIMIT 30;
+
+DO $$
+DECLARE
+    tbl text;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY[
+        'fii_cash_raw',
+        'dii_cash_raw',
+        'index_futures_raw',
+        'options_summary_raw',
+        'institutional_regime'
+    ]
+    LOOP
+        IF NOT EXISTS (
+            SELECT 1
+            FROM pg_index i
+            JOIN pg_attribute a
+              ON a.attrelid = i.indrelid
+             AND a.attnum = i.indkey[0]
+            WHERE i.indrelid = tbl::regclass
+              AND a.attname = 'trade_date'
+        ) THEN
+            EXECUTE format(
+                'CREATE INDEX %I ON %I (trade_date DESC)',
+                tbl || '_td_desc',
+                tbl
+            );
+        END IF;
+    END LOOP;
+END
+$$;
@@ -0,0 +1,48 @@
+-- Maintain IRS server-side: when a row arrives with irs NULL, fill it as
+-- the period-10 EMA of sts over the previous trading day's stored irs
+-- (seeded with sts itself), and fill market_phase from it. The phase
+-- thresholds mirror classification.classify_phase.
+--
+-- Rows that already carry irs (backfills) are stored as sent. On upsert
+-- conflicts the computed values reach the update through EXCLUDED, so
+-- clients should send irs / market_phase explicitly as null.
+
+CREATE OR REPLACE FUNCTION compute_irs()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    prev numeric;
+BEGIN
+    IF NEW.irs IS NULL THEN
+        SELECT irs INTO prev
+        FROM institutional_regime
+        WHERE trade_date < NEW.trade_date
+        ORDER BY trade_date DESC
+        LIMIT 1;
+
+        NEW.irs := round(
+            (NEW.sts * 2 / 11 + COALESCE(prev, NEW.sts) * 9 / 11)::numeric,
+            3
+        );
+    END IF;
+
+    IF NEW.market_phase IS NULL THEN
+        NEW.market_phase := CASE
+            WHEN NEW.irs > 1.5 THEN 'Accumulation'
+            WHEN NEW.irs > 0.5 THEN 'Bullish Bias'
+            WHEN NEW.irs < -1.5 THEN 'Distribution'
+            WHEN NEW.irs < -0.5 THEN 'Bearish Bias'
+            ELSE 'Transition'
+        END;
+    END IF;
+
+    RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS institutional_regime_compute_irs ON institutional_regime;
+
+CREATE TRIGGER institutional_regime_compute_irs
+BEFORE INSERT ON institutional_regime
+FOR EACH ROW EXECUTE FUNCTION compute_irs();
@@ -0,0 +1,94 @@
+-- Upsert rows into several trade_date-keyed tables in one request. The
+-- function body is a single transaction, so a daily run's raw and derived
+-- rows are stored together or not at all.
+--
+--   payload: {"fii_cash_raw": [{...}], "institutional_regime": [{...}], ...}
+--   returns: the same shape with the stored rows (after triggers)
+--
+-- Only the columns present in each table's first row are written.
+
+CREATE OR REPLACE FUNCTION upsert_rows(payload json)
+RETURNS json
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    tbl text;
+    tbl_rows json;
+    cols text;
+    updates text;
+    stored json;
+    result jsonb := '{}'::jsonb;
+BEGIN
+    FOR tbl, tbl_rows IN SELECT key, value FROM json_each(payload) LOOP
+        CONTINUE WHEN json_array_length(tbl_rows) = 0;
+
+        SELECT string_agg(format('%I', k), ', '),
+               string_agg(format('%I = EXCLUDED.%I', k, k), ', ')
+        INTO cols, updates
+        FROM json_object_keys(tbl_rows -> 0) AS k;
+
+        EXECUTE format(
+            'WITH stored AS (
+                 INSERT INTO %1$I (%2$s)
+                 SELECT %2$s FROM json_populate_recordset(NULL::%1$I, $1)
+                 ON CONFLICT (trade_date) DO UPDATE SET %3$s
+                 RETURNING *
+             )
+             SELECT coalesce(json_agg(stored), ''[]''::json) FROM stored',
+            tbl, cols, updates
+        )
+        INTO stored
+        USING tbl_rows;
+
+        result := result || jsonb_build_object(tbl, stored);
+    END LOOP;
+
+    RETURN result;
+END
+$$;
+
+-- run() now writes today's rows last, so it reads the history strictly
+-- before today and appends today's values itself.
+
+DROP FUNCTION IF EXISTS get_signal_history(int);
+
+CREATE OR REPLACE FUNCTION get_signal_history(n int, before_date date DEFAULT NULL)
+RETURNS json
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'cash', (
+            SELECT coalesce(json_agg(fii_net ORDER BY trade_date DESC), '[]'::json)
+            FROM (
+                SELECT trade_date, fii_net FROM fii_cash_raw
+                WHERE before_date IS NULL OR trade_date < before_date
+                ORDER BY trade_date DESC LIMIT n
+            ) s
+        ),
+        'pos', (
+            SELECT coalesce(json_agg(net_position ORDER BY trade_date DESC), '[]'::json)
+            FROM (
+                SELECT trade_date, net_position FROM index_futures_raw
+                WHERE before_date IS NULL OR trade_date < before_date
+                ORDER BY trade_date DESC LIMIT n
+            ) s
+        ),
+        'oi', (
+            SELECT coalesce(json_agg(oi_change ORDER BY trade_date DESC), '[]'::json)
+            FROM (
+                SELECT trade_date, oi_change FROM index_futures_raw
+                WHERE before_date IS NULL OR trade_date < before_date
+                ORDER BY trade_date DESC LIMIT n
+            ) s
+        ),
+        'pcr', (
+            SELECT coalesce(json_agg(pcr ORDER BY trade_date DESC), '[]'::json)
+            FROM (
+                SELECT trade_date, pcr FROM options_summary_raw
+                WHERE before_date IS NULL OR trade_date < before_date
+                ORDER BY trade_date DESC LIMIT n
+            ) s
+        )
+    );
+$$;
@@ -0,0 +1,46 @@
+-- Also return the most recently stored fii_net (any date, today included)
+-- so run()'s duplicate-send check shares the history round-trip.
+
+CREATE OR REPLACE FUNCTION get_signal_history(n int, before_date date DEFAULT NULL)
+RETURNS json
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'latest_cash', (
+            SELECT fii_net FROM fii_cash_raw ORDER BY trade_date DESC LIMIT 1
+        ),
+        'cash', (
+            SELECT coalesce(json_agg(fii_net ORDER BY trade_date DESC), '[]'::json)
+            FROM (
+                SELECT trade_date, fii_net FROM fii_cash_raw
+                WHERE before_date IS NULL OR trade_date < before_date
+                ORDER BY trade_date DESC LIMIT n
+            ) s
+        ),
+        'pos', (
+            SELECT coalesce(json_agg(net_position ORDER BY trade_date DESC), '[]'::json)
+            FROM (
+                SELECT trade_date, net_position FROM index_futures_raw
+                WHERE before_date IS NULL OR trade_date < before_date
+                ORDER BY trade_date DESC LIMIT n
+            ) s
+        ),
+        'oi', (
+            SELECT coalesce(json_agg(oi_change ORDER BY trade_date DESC), '[]'::json)
+            FROM (
+                SELECT trade_date, oi_change FROM index_futures_raw
+                WHERE before_date IS NULL OR trade_date < before_date
+                ORDER BY trade_date DESC LIMIT n
+            ) s
+        ),
+        'pcr', (
+            SELECT coalesce(json_agg(pcr ORDER BY trade_date DESC), '[]'::json)
+            FROM (
+                SELECT trade_date, pcr FROM options_summary_raw
+                WHERE before_date IS NULL OR trade_date < before_date
+                ORDER BY trade_date DESC LIMIT n
+            ) s
+        )
+    );
+$$;
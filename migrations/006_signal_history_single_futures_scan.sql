@@ -0,0 +1,35 @@
+-- Read net_position and oi_change from one index_futures_raw subquery
+-- instead of two. Each table still contributes its own last n rows (not
+-- an inner JOIN on trade_date), so a date missing from one raw table does
+-- not shorten the other histories.
+
+CREATE OR REPLACE FUNCTION get_signal_history(n int, before_date date DEFAULT NULL)
+RETURNS json
+LANGUAGE sql
+STABLE
+AS $$
+    WITH cash AS (
+        SELECT trade_date, fii_net FROM fii_cash_raw
+        WHERE before_date IS NULL OR trade_date < before_date
+        ORDER BY trade_date DESC LIMIT n
+    ),
+    fut AS (
+        SELECT trade_date, net_position, oi_change FROM index_futures_raw
+        WHERE before_date IS NULL OR trade_date < before_date
+        ORDER BY trade_date DESC LIMIT n
+    ),
+    opt AS (
+        SELECT trade_date, pcr FROM options_summary_raw
+        WHERE before_date IS NULL OR trade_date < before_date
+        ORDER BY trade_date DESC LIMIT n
+    )
+    SELECT json_build_object(
+        'latest_cash', (
+            SELECT fii_net FROM fii_cash_raw ORDER BY trade_date DESC LIMIT 1
+        ),
+        'cash', (SELECT coalesce(json_agg(fii_net ORDER BY trade_date DESC), '[]'::json) FROM cash),
+        'pos', (SELECT coalesce(json_agg(net_position ORDER BY trade_date DESC), '[]'::json) FROM fut),
+        'oi', (SELECT coalesce(json_agg(oi_change ORDER BY trade_date DESC), '[]'::json) FROM fut),
+        'pcr', (SELECT coalesce(json_agg(pcr ORDER BY trade_date DESC), '[]'::json) FROM opt)
+    );
+$$;
@@ -1,7 +1,7 @@
 import datetime
 import logging
 
-from db import upsert
+from db import upsert_rows
 from calculations import calculate_ema
 from classification import classify_bias, classify_phase
 
@@ -10,6 +10,8 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+logger = logging.getLogger(__name__)
+
 
 def seed_neutral_history(days=30):
 
@@ -18,7 +20,13 @@ def seed_neutral_history(days=30):
 
     previous_irs = 0  # Start neutral
 
-    logging.info(f"Seeding {days} neutral days...")
+    logger.info("Seeding %s neutral days...", days)
+
+    fii_rows = []
+    fut_rows = []
+    opt_rows = []
+    zs_rows = []
+    regime_rows = []
 
     for i in range(days):
         trade_date = start_date + datetime.timedelta(days=i)
@@ -27,6 +35,8 @@ def seed_neutral_history(days=30):
         if trade_date.weekday() >= 5:
             continue
 
+        td_str = str(trade_date)
+
         fii_net = 0
         sts = 0
 
@@ -36,47 +46,55 @@ def seed_neutral_history(days=30):
         bias = classify_bias(sts)
         phase = classify_phase(irs)
 
-        # Insert raw
-        upsert("fii_cash_raw", {
-            "trade_date": str(trade_date),
+        # Raw rows
+        fii_rows.append({
+            "trade_date": td_str,
             "fii_buy": 0,
             "fii_sell": 0,
             "fii_net": 0
         })
 
-        upsert("index_futures_raw", {
-            "trade_date": str(trade_date),
+        fut_rows.append({
+            "trade_date": td_str,
             "net_position": 0,
             "oi": 0,
             "oi_change": 0
         })
 
-        upsert("options_summary_raw", {
-            "trade_date": str(trade_date),
+        opt_rows.append({
+            "trade_date": td_str,
             "total_call_oi": 0,
             "total_put_oi": 0,
             "pcr": 1
         })
 
-        upsert("institutional_zscores", {
-            "trade_date": str(trade_date),
+        zs_rows.append({
+            "trade_date": td_str,
             "cash_z": 0,
             "futures_z": 0,
             "pcr_z": 0,
             "sts": 0
         })
 
-        upsert("institutional_regime", {
-            "trade_date": str(trade_date),
+        regime_rows.append({
+            "trade_date": td_str,
             "sts": 0,
             "irs": round(irs, 3),
             "market_phase": phase,
             "tomorrow_bias": bias
         })
 
-        logging.info(f"Seeded {trade_date}")
-
-    logging.info("Neutral seeding completed successfully.")
+    # One request, one transaction for every table
+    upsert_rows({
+        "fii_cash_raw": fii_rows,
+        "index_futures_raw": fut_rows,
+        "options_summary_raw": opt_rows,
+        "institutional_zscores": zs_rows,
+        "institutional_regime": regime_rows,
+    })
+
+    logger.info("Seeded %s days", len(fii_rows))
+    logger.info("Neutral seeding completed successfully.")
 
 
 if __name__ == "__main__":
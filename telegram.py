@@ -1,24 +1,120 @@
+import httpx
+import orjson
 import requests
 import logging
+from typing import List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
+logger = logging.getLogger(__name__)
 
-def send_message(message: str):
+# Telegram's sendMessage text limit
+MAX_MESSAGE_LEN = 4096
+MESSAGE_SEPARATOR = "\n\n"
+
+
+# Keep-alive session so repeated sends reuse one TLS connection.
+# Transient Telegram errors (incl. 429) are retried by urllib3 with
+# exponential backoff plus jitter, capped at 30s, honouring Retry-After.
+# Read errors are not retried: the message may already have been posted.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=3,
+        read=0,
+        backoff_factor=0.5,
+        backoff_jitter=0.5,
+        backoff_max=30,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],
+        respect_retry_after_header=True,
+    ),
+))
+
+
+def _send_message_request(message: str, parse_mode: Optional[str]):
+    """
+    Returns (url, body) for a sendMessage call, or None if credentials are missing.
+    """
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        logging.error("Telegram credentials missing.")
-        return
+        logger.error("Telegram credentials missing.")
+        return None
 
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
 
     payload = {
         "chat_id": TELEGRAM_CHAT_ID,
-        "text": message,
-        "parse_mode": "Markdown"
+        "text": message
     }
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+
+    return url, orjson.dumps(payload)
+
+
+def send_message(message: str, parse_mode: Optional[str] = "Markdown"):
+    request = _send_message_request(message, parse_mode)
+    if request is None:
+        return
+
+    url, body = request
 
     try:
-        response = requests.post(url, json=payload, timeout=10)
+        response = _session.post(
+            url,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            timeout=10
+        )
         response.raise_for_status()
-        logging.info("Telegram report sent successfully")
+        logger.info("Telegram report sent successfully")
     except Exception as e:
-        logging.error(f"Telegram send failed: {e}")
\ No newline at end of file
+        logger.error("Telegram send failed: %s", e)
+
+
+async def send_message_async(message: str, parse_mode: Optional[str] = "Markdown"):
+    """
+    Non-blocking send_message for event-loop callers. No automatic retries.
+
+    Opens a client per call: pooled connections belong to the event loop
+    that opened them, so a cached client breaks (or leaks its sockets)
+    across asyncio.run calls.
+    """
+    request = _send_message_request(message, parse_mode)
+    if request is None:
+        return
+
+    url, body = request
+
+    try:
+        async with httpx.AsyncClient(http2=True, timeout=10) as client:
+            response = await client.post(
+                url,
+                content=body,
+                headers={"Content-Type": "application/json"}
+            )
+        response.raise_for_status()
+        logger.info("Telegram report sent successfully")
+    except Exception as e:
+        logger.error("Telegram send failed: %s", e)
+
+
+def send_messages(messages: List[str], parse_mode: Optional[str] = "Markdown"):
+    """
+    Sends several texts in as few sendMessage calls as Telegram's length
+    limit allows, joining consecutive messages with a blank line.
+    (sendMediaGroup only batches media, not text.)
+    """
+    batches: List[str] = []
+
+    for message in messages:
+        if batches and len(batches[-1]) + len(MESSAGE_SEPARATOR) + len(message) <= MAX_MESSAGE_LEN:
+            batches[-1] += MESSAGE_SEPARATOR + message
+        else:
+            batches.append(message)
+
+    for batch in batches:
+        send_message(batch, parse_mode=parse_mode)
\ No newline at end of file